@@ -0,0 +1,194 @@
+import queue
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('qtpy')
+from qtpy import QtCore, QtWidgets  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def qapp():
+    app = QtWidgets.QApplication.instance()
+    if app is None:
+        app = QtWidgets.QApplication([b'bluesky-ui tests'])
+    return app
+
+
+def slot_names(obj):
+    "Names of the slots registered on the static meta-object."
+    mo = obj.metaObject()
+    names = set()
+    for i in range(mo.methodCount()):
+        method = mo.method(i)
+        if method.methodType() == QtCore.QMetaMethod.Slot:
+            sig = bytes(method.methodSignature()).decode()
+            names.add(sig.split('(')[0])
+    return names
+
+
+def has_slot(obj, signature):
+    mo = obj.metaObject()
+    norm = bytes(QtCore.QMetaObject.normalizedSignature(signature)).decode()
+    return mo.indexOfSlot(norm) >= 0
+
+
+def make_gui(**kwargs):
+    import bluesky.plans as bp
+    from bluesky_ui.runengine import Teleporter
+    from bluesky_ui.widgets import (ControlGui, Count, Scan1D,
+                                    MotorSelector, DetectorSelector)
+    dets = [SimpleNamespace(name='det'), SimpleNamespace(name='det1')]
+    motors = [SimpleNamespace(name='motor'), SimpleNamespace(name='motor1')]
+    return ControlGui(queue.Queue(), Teleporter(),
+                      Count('Count', bp.count,
+                            DetectorSelector(detectors=dets)),
+                      Scan1D('1D scan', bp.scan,
+                             MotorSelector(motors),
+                             DetectorSelector(detectors=dets)),
+                      **kwargs)
+
+
+def test_static_slots(qapp):
+    "Check that the signal targets are declared as static slots."
+    gui = make_gui()
+    assert has_slot(gui, '_submit_plan()')
+    assert has_slot(gui, '_show_md()')
+    assert '_dispatch' in slot_names(gui)
+    assert 'doc_consumer' in slot_names(gui.label)
+    motor_selector = gui.tabs._scans[1].motors_widget
+    assert has_slot(motor_selector, 'set_active_motor(int)')
+
+
+def test_metadata_entries(qapp):
+    "Check that values are parsed and entries can be removed."
+    from bluesky_ui.widgets import MetadataDialog
+    md = MetadataDialog()
+    md.add_entry('temperature', '300')
+    md.add_entry('sample', 'Fe2O3')
+    md.add_entry('', 'ignored')
+    assert md.get_metadata() == {'temperature': 300, 'sample': 'Fe2O3'}
+
+    # click 'remove' on the temperature entry
+    md._entries[0][2].click()
+    assert md.get_metadata() == {'sample': 'Fe2O3'}
+
+    md._entries[0][1].setText("'300'")
+    assert md.get_metadata() == {'sample': '300'}
+
+    # valid syntax that literal_eval cannot build stays text
+    for text in ('{[1]: 2}', '{[]}'):
+        md._entries[0][1].setText(text)
+        assert md.get_metadata() == {'sample': text}
+
+
+def test_metadata_round_trip(qapp):
+    "Check that set_metadata then get_metadata gives back the input."
+    from bluesky_ui.widgets import MetadataDialog
+    md = MetadataDialog()
+    expected = {'temperature': 300, 'scale': 1.5, 'sample': 'Fe2O3',
+                'label': '300', 'tags': ['a', 'b'], 'odd': '{[]}'}
+    md.set_metadata(expected)
+    assert md.get_metadata() == expected
+    md.set_metadata({'other': 'value'})
+    assert md.get_metadata() == {'other': 'value'}
+
+
+def test_detector_selection(qapp):
+    "Check that the selected detectors follow the check boxes, in order."
+    from bluesky_ui.widgets import DetectorSelector
+    dets = [SimpleNamespace(name=f'det{i}') for i in range(4)]
+    selector = DetectorSelector(detectors=dets)
+    buttons = {b.det.name: b for b in selector.button_group.buttons()}
+    assert selector.get_detectors() == ()
+
+    buttons['det3'].setChecked(True)
+    buttons['det0'].setChecked(True)
+    buttons['det2'].setChecked(True)
+    assert selector.get_detectors() == (dets[0], dets[2], dets[3])
+
+    buttons['det2'].setChecked(False)
+    assert selector.get_detectors() == (dets[0], dets[3])
+    # asking again serves the cached tuple
+    assert selector.get_detectors() is selector.get_detectors()
+
+
+def test_submit_plan(qapp):
+    "Check that SCAN queues the plan, with or without prepare_plan."
+    from bluesky_ui.runengine import Teleporter
+    from bluesky_ui.widgets import ControlGui, Count, DetectorSelector
+
+    def count(dets, **kwargs):
+        return ('count', dets, kwargs)
+
+    class GetPlanOnly(QtWidgets.QWidget):
+        name = 'custom'
+
+        def get_plan(self):
+            return 'custom plan'
+
+    dets = [SimpleNamespace(name='det')]
+    q = queue.Queue()
+    gui = ControlGui(q, Teleporter(),
+                     Count('Count', count, DetectorSelector(detectors=dets)),
+                     GetPlanOnly())
+
+    gui._submit_plan()
+    gui._submit_pool.waitForDone()
+    assert q.get_nowait() == ('count', (),
+                              {'num': 1, 'delay': None, 'md': {}})
+
+    gui.tabs.tab_widget.setCurrentIndex(1)
+    gui._submit_plan()
+    gui._submit_pool.waitForDone()
+    assert q.get_nowait() == 'custom plan'
+
+
+def test_mover_ranger_parameters(qapp):
+    "Check the cached spinner values and their invalidation."
+    from bluesky_ui.widgets import MoverRanger
+    ranger = MoverRanger('motor', SimpleNamespace(name='motor'))
+    calls = []
+    lower_params = ranger.lower.get_parameters
+
+    def counting_params():
+        calls.append(1)
+        return lower_params()
+
+    ranger.lower.get_parameters = counting_params
+
+    ranger.lower.setValue(1)
+    ranger.upper.setValue(5)
+    assert ranger.get_parameters() == {'start': 1, 'stop': 5, 'steps': 10}
+    ranger.get_parameters()
+    assert len(calls) == 1
+
+    # a new value is picked up; the returned dict is not the cache
+    ranger.upper.setValue(7)
+    params = ranger.get_parameters()
+    assert params['stop'] == 7
+    params['stop'] = 0
+    assert ranger.get_parameters()['stop'] == 7
+
+    # disabled spinners are left out without any cache invalidation
+    n = len(calls)
+    ranger.lower.setEnabled(False)
+    assert 'start' not in ranger.get_parameters()
+    ranger.lower.setEnabled(True)
+    assert ranger.get_parameters()['start'] == 1
+    assert len(calls) == n
+
+
+def test_count_delay(qapp):
+    "Check that the delay check box switches the delay on and off."
+    from bluesky_ui.widgets import Count, DetectorSelector
+    count = Count('Count', lambda dets, **kwargs: None,
+                  DetectorSelector(detectors=[]))
+    count.delay_spin.setValue(2.5)
+    assert count.prepare_plan().keywords['delay'] is None
+
+    count.delay_cb.setChecked(True)
+    assert count.prepare_plan().keywords['delay'] == 2.5
+
+    count.delay_cb.setChecked(False)
+    assert count.prepare_plan().keywords['delay'] is None
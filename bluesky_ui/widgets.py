@@ -1,20 +1,41 @@
-from qtpy import QtWidgets
+import ast
+import copy
+from functools import partial
+
+from qtpy import QtCore, QtWidgets
 from bluesky.run_engine import Dispatcher
 from bluesky.callbacks.best_effort import BestEffortCallback
 from event_model import DocumentNames
 
-from pyqtgraph.parametertree import ParameterTree
+from mily.widgets import MISpin, MFSpin
+
+# str -> DocumentNames, skips the enum lookup per document
+_DOC_NAMES = {n.value: n for n in DocumentNames}
+
 
-from mily.widgets import (vstacked_label,
-                          hstacked_label, MISpin, MFSpin,
-                          MetaDataEntry)
+def _parse_value(text):
+    """Interpret text as a Python literal, falling back to the string."""
+    try:
+        return ast.literal_eval(text)
+    except Exception:
+        # literal_eval can also raise TypeError (e.g. '{[]}'),
+        # MemoryError or RecursionError
+        return text
+
+
+def _format_value(value):
+    """Inverse of _parse_value."""
+    if isinstance(value, str) and _parse_value(value) == value:
+        return value
+    return repr(value)
 
 
 def merge_parameters(widget_iter):
-    return {k: v
-            for w in widget_iter
-            for k, v in w.get_parameters().items()
-            if w.isEnabled()}
+    out = {}
+    for w in widget_iter:
+        if w.isEnabled():
+            out.update(w.get_parameters())
+    return out
 
 
 class MoverRanger(QtWidgets.QWidget):
@@ -26,6 +47,7 @@ class MoverRanger(QtWidgets.QWidget):
         super().__init__(**kwargs)
         self.name = name
         self.mover = None
+        self._params = None
         hlayout = QtWidgets.QHBoxLayout()
         label = self.label = QtWidgets.QLabel('')
         lower = self.lower = MFSpin(start_name)
@@ -36,16 +58,23 @@ class MoverRanger(QtWidgets.QWidget):
 
         hlayout.addWidget(label)
         hlayout.addStretch()
-        hlayout.addLayout(vstacked_label(start_name, lower))
-        hlayout.addLayout(vstacked_label(stop_name, upper))
-        hlayout.addLayout(vstacked_label(steps_name, stps))
+        # name the spinners with a prefix rather than a label + layout each
+        for w, w_name in ((lower, start_name),
+                          (upper, stop_name),
+                          (stps, steps_name)):
+            w.setPrefix(f'{w_name}: ')
+            hlayout.addWidget(w)
         self.setLayout(hlayout)
 
+        for w in (lower, upper, stps):
+            w.valueChanged.connect(self._invalidate)
+
         if mover is not None:
             self.set_mover(mover)
 
     def set_mover(self, mover):
         self.mover = mover
+        self._params = None
         self.label.setText(mover.name)
         limits = getattr(mover, 'limits', (0, 0))
         upper = self.upper
@@ -60,8 +89,28 @@ class MoverRanger(QtWidgets.QWidget):
             lower.setSuffix(f' {egu}')
             upper.setSuffix(f' {egu}')
 
+    def set_active(self, active):
+        """Block (or unblock) the spinner signals while off screen."""
+        for w in (self.lower, self.upper, self.steps):
+            w.blockSignals(not active)
+        # anything may have changed while the signals were blocked
+        self._params = None
+
+    @QtCore.Slot()
+    def _invalidate(self):
+        self._params = None
+
     def get_parameters(self):
-        return merge_parameters([self.lower, self.upper, self.steps])
+        # only the spinner values are cached; whether a spinner is
+        # enabled is checked on every read
+        if self._params is None:
+            self._params = [(w, w.get_parameters())
+                            for w in (self.lower, self.upper, self.steps)]
+        out = {}
+        for w, params in self._params:
+            if w.isEnabled():
+                out.update(params)
+        return out
 
     def get_args(self):
         return (self.mover,
@@ -83,15 +132,34 @@ class DetectorSelector(QtWidgets.QGroupBox):
         self.button_group.setExclusive(False)
         vlayout = QtWidgets.QVBoxLayout()
         self.setLayout(vlayout)
-        for d in detectors:
+        # bit i of the mask is set when detector i is checked
+        self._dets = tuple(detectors)
+        self._mask = 0
+        self._cached = None
+        self._index = {}
+        for i, d in enumerate(self._dets):
             button = DetectorCheck(d)
+            self._index[button] = i
             self.button_group.addButton(button)
             vlayout.addWidget(button)
+        self.button_group.buttonToggled[
+            QtWidgets.QAbstractButton, bool].connect(self._on_toggled)
+
+    @QtCore.Slot(QtWidgets.QAbstractButton, bool)
+    def _on_toggled(self, button, checked):
+        i = self._index[button]
+        if checked:
+            self._mask |= (1 << i)
+        else:
+            self._mask &= ~(1 << i)
+        self._cached = None
 
     def get_detectors(self):
-        return tuple(b.det
-                     for b in self.button_group.buttons()
-                     if b.isChecked())
+        if self._cached is None:
+            mask = self._mask
+            self._cached = tuple([d for i, d in enumerate(self._dets)
+                                  if mask & (1 << i)])
+        return self._cached
 
 
 class MotorSelector(QtWidgets.QWidget):
@@ -110,36 +178,45 @@ class MotorSelector(QtWidgets.QWidget):
         self.motors = []
         self.cb = combobox = QtWidgets.QComboBox()
         hlayout = QtWidgets.QHBoxLayout()
-        motor_layout = QtWidgets.QHBoxLayout()
+        # only the current page of the stack is laid out and painted
+        self.stack = QtWidgets.QStackedWidget()
 
         for motor in motors:
             mrw = MoverRanger(motor.name, motor)
+            # the label is redundant with the drop down
             mrw.label.setVisible(False)
+            mrw.set_active(False)
             self.motors.append(mrw)
-            motor_layout.addWidget(mrw)
-            # the label is redundant with the drop down
-            mrw.setVisible(False)
+            self.stack.addWidget(mrw)
             combobox.addItem(motor.name)
 
         combobox.currentIndexChanged[int].connect(
             self.set_active_motor)
 
         hlayout.addWidget(combobox)
-        hlayout.addLayout(motor_layout)
+        hlayout.addWidget(self.stack)
 
         self.setLayout(hlayout)
+        self.active_motor = None
         self.set_active_motor(0)
 
+    @QtCore.Slot(int)
     def set_active_motor(self, n):
         try:
-            self.active_motor = self.motors[n]
-            for m in self.motors:
-                if m is not self.active_motor:
-                    m.setVisible(False)
-            self.active_motor.setVisible(True)
-
+            target = self.motors[n]
         except IndexError:
-            pass
+            return
+        # coalesce the page switch into a single repaint
+        self.setUpdatesEnabled(False)
+        try:
+            if self.active_motor is not None:
+                self.active_motor.set_active(False)
+            self.active_motor = target
+            target.set_active(True)
+            self.stack.setCurrentIndex(n)
+        finally:
+            self.setUpdatesEnabled(True)
+            self.update()
 
     def get_args(self):
         return self.active_motor.get_args()
@@ -158,8 +235,18 @@ class TabScanSelector(QtWidgets.QWidget):
 
         self.setLayout(vlayout)
 
+    def prepare_plan(self):
+        scan = self.tab_widget.currentWidget()
+        try:
+            prepare = scan.prepare_plan
+        except AttributeError:
+            # only get_plan is required of a scan widget
+            plan = scan.get_plan()
+            return lambda: plan
+        return prepare()
+
     def get_plan(self):
-        return self.tab_widget.currentWidget().get_plan()
+        return self.prepare_plan()()
 
 
 class Scan1D(QtWidgets.QWidget):
@@ -189,13 +276,17 @@ class Scan1D(QtWidgets.QWidget):
 
         self.setLayout(vlayout)
 
-    def get_plan(self):
+    def prepare_plan(self):
+        """Snapshot the inputs as a partial of the plan function."""
         md = (self.md_parameters.get_metadata()
               if self.md_parameters is not None
               else None)
-        return self.plan_function(self.dets.get_detectors(),
-                                  *self.motors_widget.get_args(),
-                                  md=md)
+        return partial(self.plan_function, self.dets.get_detectors(),
+                       *self.motors_widget.get_args(),
+                       md=md)
+
+    def get_plan(self):
+        return self.prepare_plan()()
 
 
 class Count(QtWidgets.QWidget):
@@ -207,56 +298,141 @@ class Count(QtWidgets.QWidget):
         self.md_parameters = md_parameters
 
         vlayout = QtWidgets.QVBoxLayout()
-        hlayout = QtWidgets.QHBoxLayout()
+        form = QtWidgets.QFormLayout()
         # num spinner
         self.num_spin = MISpin('num')
         self.num_spin.setRange(1, 2**16)  # 65k maximum, 18hr @ 1hz
-        hlayout.addLayout(hstacked_label('num', self.num_spin))
+        form.addRow('num', self.num_spin)
 
-        # float spinner
+        # float spinner, only used when the check box is ticked
         self.delay_spin = MFSpin('delay')
         self.delay_spin.setRange(0, 60*60)  # maximum delay an hour
         self.delay_spin.setDecimals(1)  # only 0.1s precision from GUI
         self.delay_spin.setSuffix('s')
-        label_layout = QtWidgets.QHBoxLayout()
-        inner_layout = QtWidgets.QHBoxLayout()
-        cb = QtWidgets.QCheckBox()
-        label_layout.addWidget(QtWidgets.QCheckBox())
-        inner_layout.addWidget(QtWidgets.QLabel('delay'))
-        inner_layout.addWidget(self.delay_spin)
-        label_layout.addLayout(inner_layout)
-        label_layout.addStretch()
-        cb.setCheckable(True)
-        cb.stateChanged.connect(self.delay_spin.setEnabled)
-        cb.setChecked(False)
         self.delay_spin.setEnabled(False)
-        hlayout.addLayout(label_layout)
-        hlayout.addStretch()
-        vlayout.addLayout(hlayout)
+        self.delay_cb = QtWidgets.QCheckBox()
+        self.delay_cb.toggled.connect(self.delay_spin.setEnabled)
+        delay_row = QtWidgets.QHBoxLayout()
+        delay_row.addWidget(self.delay_cb)
+        delay_row.addWidget(self.delay_spin)
+        form.addRow('delay', delay_row)
+        vlayout.addLayout(form)
         # set up the detector selector
         self.dets = detectors_widget
         vlayout.addWidget(self.dets)
 
         self.setLayout(vlayout)
 
-    def get_plan(self):
+    def prepare_plan(self):
+        """Snapshot the inputs as a partial of the plan function."""
         d = self.delay_spin.value() if self.delay_spin.isEnabled() else None
         num = self.num_spin.value()
         md = (self.md_parameters.get_metadata()
               if self.md_parameters is not None
               else None)
-        return self.plan_function(self.dets.get_detectors(),
-                                  num=num,
-                                  delay=d,
-                                  md=md)
+        return partial(self.plan_function, self.dets.get_detectors(),
+                       num=num,
+                       delay=d,
+                       md=md)
+
+    def get_plan(self):
+        return self.prepare_plan()()
 
 
 class StartLabel(QtWidgets.QLabel):
     format_str = 'last scan: {uid}'
 
+    @QtCore.Slot(str, object)
     def doc_consumer(self, name, doc):
         if name == 'start':
-            self.setText(self.format_str.format(**doc))
+            self.setText(self.format_str.format_map(doc))
+
+
+class MetadataDialog(QtWidgets.QDialog):
+    """Editor for flat key/value metadata.
+
+    Each entry is a pair of line edits with a remove button; entries
+    with an empty key are ignored.  Values are read as Python literals where possible (so
+    ``300`` is an int and ``'300'`` a str), otherwise as plain text.
+    The metadata is cached until an entry is edited.
+    """
+    def __init__(self, title='Metadata', **kwargs):
+        super().__init__(**kwargs)
+        self.setWindowTitle(title)
+        self._entries = []
+        self._md_cache = None
+        self.form = QtWidgets.QFormLayout()
+
+        add_button = QtWidgets.QPushButton('add entry')
+        add_button.clicked.connect(self._add_blank_entry)
+        buttons = QtWidgets.QDialogButtonBox(
+            QtWidgets.QDialogButtonBox.Close)
+        buttons.rejected.connect(self.reject)
+
+        vlayout = QtWidgets.QVBoxLayout()
+        vlayout.addLayout(self.form)
+        vlayout.addWidget(add_button)
+        vlayout.addWidget(buttons)
+        self.setLayout(vlayout)
+
+    @QtCore.Slot()
+    def _add_blank_entry(self):
+        self.add_entry()
+
+    def add_entry(self, key='', value=''):
+        key_edit = QtWidgets.QLineEdit(key)
+        value_edit = QtWidgets.QLineEdit(value)
+        remove_button = QtWidgets.QPushButton('remove')
+        remove_button.clicked.connect(self._remove_clicked)
+        field = QtWidgets.QWidget()
+        field_layout = QtWidgets.QHBoxLayout()
+        field_layout.setContentsMargins(0, 0, 0, 0)
+        field_layout.addWidget(value_edit)
+        field_layout.addWidget(remove_button)
+        field.setLayout(field_layout)
+        self.form.addRow(key_edit, field)
+        self._entries.append((key_edit, value_edit, remove_button))
+        key_edit.textChanged.connect(self._invalidate_md_cache)
+        value_edit.textChanged.connect(self._invalidate_md_cache)
+        self._md_cache = None
+
+    @QtCore.Slot()
+    def _remove_clicked(self):
+        button = self.sender()
+        for entry in self._entries:
+            if entry[2] is button:
+                self._remove_entry(entry)
+                break
+
+    def _remove_entry(self, entry):
+        key_edit, _, remove_button = entry
+        row, _ = self.form.getWidgetPosition(key_edit)
+        # take rather than remove the row: the button may be in the
+        # middle of delivering its clicked signal
+        self.form.takeRow(row)
+        for w in (key_edit, remove_button.parentWidget()):
+            w.hide()
+            w.deleteLater()
+        self._entries.remove(entry)
+        self._md_cache = None
+
+    @QtCore.Slot()
+    def _invalidate_md_cache(self):
+        self._md_cache = None
+
+    def get_metadata(self):
+        if self._md_cache is None:
+            self._md_cache = {k.text(): _parse_value(v.text())
+                              for k, v, _ in self._entries
+                              if k.text()}
+        # hand out a copy so the plans cannot alter the cache
+        return copy.deepcopy(self._md_cache)
+
+    def set_metadata(self, md):
+        for entry in list(self._entries):
+            self._remove_entry(entry)
+        for k, v in md.items():
+            self.add_entry(k, _format_value(v))
 
 
 class LivePlaceholder(QtWidgets.QWidget):
@@ -267,10 +443,26 @@ class LivePlaceholder(QtWidgets.QWidget):
         layout.addWidget(self.label)
         self.setLayout(layout)
 
+    @QtCore.Slot(str, object)
     def doc_consumer(self, name, doc):
         ...
 
 
+class _PlanBuilder(QtCore.QRunnable):
+    """Build a prepared plan and hand it to the RunEngine queue."""
+    def __init__(self, build_plan, queue):
+        super().__init__()
+        self.build_plan = build_plan
+        self.queue = queue
+
+    def run(self):
+        # nothing above us would see an exception on a pool thread
+        try:
+            self.queue.put(self.build_plan())
+        except Exception as ex:
+            print(f'failed to submit plan \n{ex!r}')
+
+
 class ControlGui(QtWidgets.QWidget):
     def __init__(self, queue, teleport, *scan_widgets,
                  live_widget=None,
@@ -279,9 +471,11 @@ class ControlGui(QtWidgets.QWidget):
         self.label = label = StartLabel()
         self.queue = queue
         self.teleport = teleport
-        self.md_parameters = MetaDataEntry(name='Metadata')
-        self.md_widget = ParameterTree()
-        self.md_widget.setParameters(self.md_parameters)
+        # the editor is also the metadata source for the scans
+        self.md_widget = self.md_parameters = MetadataDialog(
+            'Metadata', parent=self)
+        # the BEC is built on first use
+        self.cbr = self.bec = None
         outmost_layout = QtWidgets.QHBoxLayout()
 
         input_layout = QtWidgets.QVBoxLayout()
@@ -299,24 +493,49 @@ class ControlGui(QtWidgets.QWidget):
         input_layout.addWidget(self.md_button)
         input_layout.addWidget(self.go_button)
 
-        self.teleport.name_doc.connect(label.doc_consumer)
-
-        self.cbr = Dispatcher()
-        self.bec = BestEffortCallback()
-        self.teleport.name_doc.connect(
-            lambda name, doc: self.cbr.process(DocumentNames(name), doc))
-        self.cbr.subscribe(self.bec)
-
-        def runner():
-            self.queue.put(self.tabs.get_plan())
-
-        self.go_button.clicked.connect(runner)
-        self.md_button.clicked.connect(self.md_widget.show)
+        # a single worker keeps the plans in submission order
+        self._submit_pool = QtCore.QThreadPool(self)
+        self._submit_pool.setMaxThreadCount(1)
+        self.go_button.clicked.connect(self._submit_plan)
+        self.md_button.clicked.connect(self._show_md)
 
         if live_widget is None:
             live_widget = LivePlaceholder()
         self.live_widget = live_widget
-        self.teleport.name_doc.connect(live_widget.doc_consumer)
+        # the placeholder ignores documents, do not feed it any (but do
+        # feed subclasses that override doc_consumer)
+        no_op = (type(live_widget).doc_consumer is
+                 LivePlaceholder.doc_consumer)
+        self._live_consumer = None if no_op else live_widget.doc_consumer
         outmost_layout.addWidget(live_widget)
 
+        # a single connection fanned out in Python rather than one
+        # (queued) signal dispatch per consumer
+        self.teleport.name_doc.connect(self._dispatch)
+
         self.setLayout(outmost_layout)
+
+    @QtCore.Slot()
+    def _submit_plan(self):
+        # snapshot the widget state here; the put blocks on the
+        # RunEngine loop, so do it in the pool
+        builder = _PlanBuilder(self.tabs.prepare_plan(), self.queue)
+        self._submit_pool.start(builder)
+
+    @QtCore.Slot()
+    def _show_md(self):
+        self.md_widget.exec_()
+
+    def _ensure_callbacks(self):
+        if self.cbr is None:
+            self.cbr = Dispatcher()
+            self.bec = BestEffortCallback()
+            self.cbr.subscribe(self.bec)
+
+    @QtCore.Slot(str, object)
+    def _dispatch(self, name, doc):
+        self._ensure_callbacks()
+        self.label.doc_consumer(name, doc)
+        self.cbr.process(_DOC_NAMES[name], doc)
+        if self._live_consumer is not None:
+            self._live_consumer(name, doc)
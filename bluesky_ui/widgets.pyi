@@ -1,4 +1,4 @@
-from typing import Generator, Tuple, Iterable, Dict, Any
+from typing import Generator, Tuple, Iterable, Dict, Any, Callable
 
 from bluesky import Msg
 
@@ -13,6 +13,15 @@ class OphydObj:
 
 
 class ScanInputWidget:
+    def prepare_plan(self) -> Callable[[], Generator[Msg]]:
+        """Read the inputs and return a callable that builds the plan.
+
+        The returned callable does not touch any widgets, so it may be
+        run off the GUI thread.  Optional: widgets without it have
+        get_plan called on the GUI thread instead.
+        """
+        ...
+
     def get_plan(self) -> Generator[Msg]:
         ...
 